@@ -1,6 +1,5 @@
 import setuptools
 import os 
-import pdb
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -1,28 +1,45 @@
 import numpy as np
 import pandas as pd
+from tqdm import tqdm
 
+import io
 import os
 import shutil
 import subprocess
-import re
-import string
-from itertools import product
+from functools import lru_cache
 import tempfile 
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-from spatialDSSAT.utils import *
-from DSSATTools import __file__ as dsssattools_module_path
-from DSSATTools import VERSION
-from DSSATTools.crop import CROP_CODES, CROPS_MODULES
+import warnings
+# DSSATTools and its dependencies emit warnings when imported. They're silenced
+# only for these imports, so the warning filters of the caller are not changed.
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    # Re-exported, they used to be available from this module as well
+    from spatialDSSAT.utils import (
+        grid_bounds, partition, cust_round, pixel_coords, weather_from_netcdf,
+        VARIABLE_MAP_AGERA5, VARIABLE_TRANS_AGERA5, MINIMUM_VARIABLE_SET, 
+        TEMP_VARS
+    )
+    from DSSATTools import __file__ as dsssattools_module_path
+    from DSSATTools import VERSION
+    from DSSATTools.crop import CROP_CODES, CROPS_MODULES
 
 from datetime import datetime, timedelta, date
-import random
-
-import warnings
-warnings.filterwarnings(action='ignore')
 
 TMP =  tempfile.gettempdir()
-# String squence to name weather files (AA, AB, AC, ..., XZ, YZ, ZZ)
-WTH_IDS = ["".join(i) for i in product(string.ascii_uppercase, string.ascii_uppercase)]
+# Weather files are named with a two letters sequence (AA, AB, AC, ..., XZ, YZ, ZZ)
+WTH_IDS = tuple(chr(65 + n//26) + chr(65 + n%26) for n in range(26*26))
+MAX_WTH_IDS = len(WTH_IDS)
+
+def _yyjjj(d):
+    """
+    Returns d as a DSSAT date (YYJJJ: two digits year and day of year). Same as
+    d.strftime("%y%j"), without going through strftime.
+    """
+    return f"{d.year % 100:02d}{d.toordinal() - date(d.year, 1, 1).toordinal() + 1:03d}"
+
 
 DSSAT_STATIC = os.path.join(os.path.dirname(dsssattools_module_path), "static")
 DSSAT_BIN = os.path.join(
@@ -31,16 +48,109 @@ DSSAT_BIN = os.path.join(
 DSSAT_HOME = os.path.join(TMP, f"DSSAT{VERSION}/")
 BIN_NAME = f"dscsm{VERSION}"
 CONFILE = f'DSSATPRO.L{VERSION[1:]}'
+# Environment for the DSSAT process. The caller environment is kept so PATH and
+# the library paths are available to DSSAT.
+DSSAT_ENV = {**os.environ, "DSSAT_HOME": DSSAT_HOME, BIN_NAME: DSSAT_BIN}
+
+def _ensure_symlink(src, dst):
+    """
+    Creates dst as a symlink to src. Nothing is done if dst already links to src.
+    The link is created under a temporary name and then moved to dst, so dst is
+    replaced atomically even if other processes are linking it at the same time.
+    """
+    try:
+        if os.readlink(dst) == src:
+            return
+    except OSError:
+        pass
+    tmp = f"{dst}.tmp{os.getpid()}"
+    try:
+        os.symlink(src, tmp)
+    except FileExistsError: # Left by a previous process with the same pid
+        os.remove(tmp)
+        os.symlink(src, tmp)
+    os.replace(tmp, dst)
+
+def _link_weather_file(src, dst):
+    assert os.path.exists(src), f"{src} does not exist"
+    _ensure_symlink(src, dst)
+
+# Number of threads used to link the weather files of a run
+LINK_WORKERS = 8
 
 # Creates a folder with DSSAT files. This is done to avoid long path names that 
 # exceed the defined lenght for path variables in DSSAT.
-if not os.path.exists(DSSAT_HOME):
-    os.mkdir(DSSAT_HOME)
-for file in os.listdir(DSSAT_STATIC):
-    file_link = os.path.join(DSSAT_HOME, file)
-    if os.path.exists(file_link):
-        os.remove(file_link)
-    os.symlink(os.path.join(DSSAT_STATIC, file), file_link)
+# Links that are already in place are kept. Other processes (e.g. run_parallel
+# workers) may be doing the same at the same time, then a link created by them
+# is not an error.
+# Once done, a sentinel file with the DSSAT_STATIC path is written, so the next
+# imports (e.g. every worker of run_parallel) skip the whole thing. It's done
+# again if DSSAT_STATIC changed after the sentinel was written, or if any of the
+# links is missing (e.g. removed by a tmp cleaner).
+DSSAT_HOME_READY = os.path.join(DSSAT_HOME, ".spatialDSSAT.ready")
+
+def _dssat_home_ready():
+    try:
+        if os.stat(DSSAT_HOME_READY).st_mtime < os.stat(DSSAT_STATIC).st_mtime:
+            return False
+        with open(DSSAT_HOME_READY) as f:
+            if f.read() != DSSAT_STATIC:
+                return False
+        with os.scandir(DSSAT_HOME) as entries:
+            existing = {entry.name for entry in entries}
+        with os.scandir(DSSAT_STATIC) as entries:
+            return all(entry.name in existing for entry in entries)
+    except OSError:
+        return False
+
+os.makedirs(DSSAT_HOME, exist_ok=True)
+if not _dssat_home_ready():
+    with os.scandir(DSSAT_HOME) as entries:
+        existing = {entry.name for entry in entries}
+    with os.scandir(DSSAT_STATIC) as entries:
+        for entry in entries:
+            file_link = os.path.join(DSSAT_HOME, entry.name)
+            try:
+                if entry.name in existing:
+                    _ensure_symlink(entry.path, file_link)
+                else:
+                    os.symlink(entry.path, file_link)
+            except FileExistsError:
+                pass
+    with open(DSSAT_HOME_READY, "w") as f:
+        f.write(DSSAT_STATIC)
+
+# Templates for the lines written once per treatment, field, fertilizer 
+# application, batch entry, cultivar and planting. %-formatting is used as it's
+# faster than both str.format and f-strings with format specs.
+_TRT_TMPL = "%2d 1 0 0 SAMPLE %-18d %2d %2d  0 %2d %2d  0 %2d  0  0  0  0  0  1\n"
+_FIELD_TMPL = "%2d SEFL00%02d SE%s%s   -99     0 DR000     0     0 00000 -99    200  IB%08d -99\n"
+_FERT_TMPL = "%2d %-5s FE005   -99     5 %5.1f   -99   -99   -99   -99   -99 -99\n"
+_BATCH_TMPL = "%-96s %2d      1      0      0      0\n"
+_CUL_TMPL = "%2d %2s %6s %-8s\n"
+_PLANT_TMPL = "%2d %5s %5s %5.1f %5.1f %5s %5s %5.0f %5.0f %5.0f %5.0f %5.0f %5.0f %5.0f %5.0f                        -99\n"
+
+# Columns of the summary DSSAT prints to stdout, and the lines to skip from it
+OUTPUT_COLUMNS = "RUN  CR  TRT FLO MAT TOPWT HARWT  RAIN  TIRR   CET  PESW  TNUP  TNLF   TSON TSOC".split()
+OUTPUT_DTYPES = {
+    "RUN": np.int32, "CR": str, "TRT": np.int32, "FLO": np.int32, "MAT": np.int32,
+    **{col: np.float32 for col in OUTPUT_COLUMNS[5:]}
+}
+
+def _skip_line(line):
+    """
+    True for the blank, header and crop lines of DSSAT stdout. Substring checks
+    are used as they're about twice as fast as a regex search.
+    """
+    return line.isspace() or b"RUN" in line or b"t/ha" in line or b"Crop" in line
+
+# Files left in the run directory after a run: the control file, the outputs
+# that are read on demand and the DSSAT diagnostics. The outputs are removed
+# before the next run, so they're never taken from a previous one.
+_OUTPUT_FILES = {
+    "OVERVIEW.OUT", "Summary.OUT", "PlantGro.OUT", "ERROR.OUT", "WARNING.OUT"
+}
+_KEEP_FILES = {CONFILE, *_OUTPUT_FILES}
 
 DEFAULT_SIMULATION_OPTIONS = {
     # Switches
@@ -61,6 +171,61 @@ DEFAULT_PLANTING_OPTIONS = {
     "PAGE": -99, "PENV": -99, "PLPH": -99, "SPRL": -99
 }
 
+def write_file(path, content):
+    """
+    Writes content to path. The DSSAT input files are plain text, then they're
+    written straight to the file descriptor, without a Python file object.
+
+    Arguments
+    ----------
+    path: str
+        Path to the file
+    content: str
+        Text to write
+    """
+    data = memoryview(content.encode())
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def write_files(files):
+    """
+    Writes several files, one after the other, with write_file.
+
+    Arguments
+    ----------
+    files: iterable of (str, str)
+        Pairs of path and text to write
+    """
+    for path, content in files:
+        write_file(path, content)
+
+
+@lru_cache(maxsize=16)
+def _render_control(crop_name):
+    """
+    Returns the content of the DSSAT control file for crop_name. The run path
+    is left as a {RUN_PATH} placeholder, as it changes from run to run.
+    """
+    crop_code = CROP_CODES[crop_name]
+    smodel = CROPS_MODULES[crop_name]
+    wth_path = "Weather"
+    control = f'WED    {wth_path}\n'
+    if crop_code in ["WH", "BA"]:
+        control += f'M{crop_code}    {{RUN_PATH}} dscsm048 CSCER{VERSION}\n'
+    else:
+        control += f'M{crop_code}    {DSSAT_HOME} dscsm048 {smodel}{VERSION}\n'
+    control += f'CRD    {os.path.join(DSSAT_HOME, "Genotype")}\n'
+    control += f'PSD    {os.path.join(DSSAT_HOME, "Pest")}\n'
+    control += f'SLD    {os.path.join(DSSAT_HOME, "Soil")}\n'
+    control += f'STD    {os.path.join(DSSAT_HOME, "StandardData")}\n'
+    return control
+
+
 def write_control_file(run_path, crop_name):
     """
     Writes DSSAT control file in the specified directory.
@@ -72,19 +237,158 @@ def write_control_file(run_path, crop_name):
     crop_code: str
         Crop name
     """
-    crop_code = CROP_CODES[crop_name]
-    smodel = CROPS_MODULES[crop_name]
-    wth_path = "Weather"
-    with open(os.path.join(run_path, CONFILE), 'w') as f:
-        f.write(f'WED    {wth_path}\n')
-        if crop_code in ["WH", "BA"]:
-            f.write(f'M{crop_code}    {run_path} dscsm048 CSCER{VERSION}\n')
-        else:
-            f.write(f'M{crop_code}    {DSSAT_HOME} dscsm048 {smodel}{VERSION}\n')
-        f.write(f'CRD    {os.path.join(DSSAT_HOME, "Genotype")}\n')
-        f.write(f'PSD    {os.path.join(DSSAT_HOME, "Pest")}\n')
-        f.write(f'SLD    {os.path.join(DSSAT_HOME, "Soil")}\n')
-        f.write(f'STD    {os.path.join(DSSAT_HOME, "StandardData")}\n')
+    write_file(
+        os.path.join(run_path, CONFILE), 
+        _render_control(crop_name).replace("{RUN_PATH}", run_path)
+    )
+
+
+# Cache size for the soil files. Spatial runs reuse the same few thousand pixel
+# soils over many runs and years.
+SOIL_CACHE_SIZE = 4096
+
+def read_soil(soil_path):
+    """
+    Returns the lines of a .SOL file as a tuple. Files are read only once per 
+    session, as the same soil is usually shared by many treatments and runs.
+    A file is read again if it was modified after that.
+
+    Arguments
+    ----------
+    soil_path: str
+        Path to the .SOL file
+    """
+    return _read_soil(soil_path, os.stat(soil_path).st_mtime_ns)
+
+
+# The modification time is part of the cache key of the soil files, then a file
+# rewritten in place is not taken from the cache.
+@lru_cache(maxsize=SOIL_CACHE_SIZE)
+def _read_soil(soil_path, mtime_ns):
+    with open(soil_path, "r") as f:
+        return tuple(f.readlines())
+
+
+@lru_cache(maxsize=SOIL_CACHE_SIZE)
+def _soil_profile_parts(soil_path, mtime_ns):
+    """
+    Returns the first line of a .SOL file without the soil ID, and the rest of
+    the file as a single string, ready to be written with a new soil ID.
+    """
+    soil_lines = _read_soil(soil_path, mtime_ns)
+    return soil_lines[0][11:], "".join(soil_lines[1:])
+
+
+def execute_batch(run_path):
+    """
+    Runs DSSAT for the DSSBatch.v48 file in the specified directory. It returns
+    a dataframe with the simulation results printed by DSSAT. If DSSAT fails a
+    RuntimeError is raised, and the files in the directory are left as they are.
+
+    Arguments
+    ----------
+    run_path: str
+        Path to the directory where the model will run
+    """
+    exc_args = [f"{DSSAT_BIN}", 'S', "DSSBatch.v48"]
+    # DSSAT output is parsed while the model runs, skipping the blank, header
+    # and crop lines, so the whole stdout is never held in memory. Lines are 
+    # kept as bytes, the C parser of pandas decodes them anyway.
+    with subprocess.Popen(exc_args, 
+        cwd=run_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        bufsize=1<<17, env=DSSAT_ENV
+    ) as proc:
+        lines = [line for line in proc.stdout if not _skip_line(line)]
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"DSSAT exited with status {proc.returncode}. The run directory "
+            f"{run_path} is kept, check its ERROR.OUT and WARNING.OUT files"
+        )
+    if len(lines) == 0:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS).astype(OUTPUT_DTYPES)
+    df = pd.read_csv(
+        io.BytesIO(b"".join(lines)), sep=r"\s+", header=None, 
+        names=OUTPUT_COLUMNS, dtype=OUTPUT_DTYPES, engine="c"
+    )
+    return df
+
+
+def _run_gsruns(gsruns, kwargs, build=None):
+    if build is not None:
+        gsruns = [build(gs) for gs in gsruns]
+    if len(gsruns) == 1:
+        return [gsruns[0].run(**kwargs)]
+    return GSRun.run_many(gsruns, **kwargs)
+
+
+def run_parallel(gsruns:list, n_workers:int=None, concat:bool=False,
+                 backend:str="process", progress:bool=False, build=None, 
+                 batch_size:int=1, **kwargs):
+    """
+    Runs several GSRun instances in parallel. It returns a list with one 
+    dataframe per run, in the same order as gsruns. Any other keyword argument 
+    is passed to the run method of each GSRun.
+
+    The overview, summary and plantgro outputs are not available after a
+    parallel run: with the "process" backend each GSRun runs as a copy in the
+    worker, and the GSRun objects passed keep them as None. The same applies to
+    runs simulated in batches (batch_size > 1) or created by build.
+
+    Arguments
+    ----------
+    gsruns: list of GSRun
+        The runs to simulate.
+    n_workers: int
+        Number of workers to use. By default half of the available CPUs are
+        used.
+    concat: bool
+        If True, the results are returned as a single dataframe.
+    backend: str
+        "process" runs each GSRun in a different process. "thread" runs them in
+        threads of the current process, which avoids pickling the GSRun objects.
+        As DSSAT runs in a subprocess, threads don't compete for the GIL while
+        the model runs. Default is "process".
+    progress: bool
+        If True, a progress bar is displayed.
+    build: callable
+        A function that returns a GSRun. If passed, gsruns can be a list of
+        anything (e.g. the pixels of each county), and every worker calls 
+        build with its item to create the GSRun it runs. Then the GSRun objects
+        are built in parallel too, and they're not sent to the workers. For the
+        "process" backend it must be defined at the module level.
+    batch_size: int
+        Number of consecutive GSRun that each worker simulates with a single 
+        DSSAT call (see GSRun.run_many), so DSSAT starts once per batch instead
+        of once per GSRun. All runs of a batch must be for the same crop, and 
+        use up to 676 weather files in total. Default is 1.
+    """
+    assert backend in ("process", "thread"), \
+        f"{backend} is not a valid backend. Use 'process' or 'thread'"
+    assert batch_size > 0, "batch_size must be a positive integer"
+    if len(gsruns) == 0:
+        if concat:
+            return pd.DataFrame(columns=OUTPUT_COLUMNS).astype(OUTPUT_DTYPES)
+        return []
+    if n_workers is None:
+        n_workers = max(1, os.cpu_count()//2)
+    if backend == "process":
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=n_workers)
+    results = [None]*len(gsruns)
+    with executor, tqdm(total=len(gsruns), disable=not progress) as pbar:
+        futures = {
+            executor.submit(_run_gsruns, gsruns[n:n+batch_size], kwargs, build): n 
+            for n in range(0, len(gsruns), batch_size)
+        }
+        for future in as_completed(futures):
+            n = futures[future]
+            batch_results = future.result()
+            results[n:n+len(batch_results)] = batch_results
+            pbar.update(len(batch_results))
+    if concat:
+        return pd.concat(results, ignore_index=True)
+    return results
 
 
 class GSRun():
@@ -106,17 +410,27 @@ class GSRun():
         crop_name: str
             Name of the crop. Default value is Maize
         '''
-        if not hasattr(self, "treatments"):
-            self._crop_name = crop_name.title()
-            assert self._crop_name in CROP_CODES.keys(), \
-                f'{self._crop_name} is not a valid crop'
+        self._crop_name = crop_name.title()
+        assert self._crop_name in CROP_CODES.keys(), \
+            f'{self._crop_name} is not a valid crop'
+        self._crop_code = CROP_CODES[self._crop_name]
+
+        # mkdtemp picks a name that doesn't exist and creates it in one step, 
+        # so instances created at the same time never share a directory.
+        self.RUN_PATH = tempfile.mkdtemp(prefix="dssatrun", dir=TMP)
+        # The control file depends only on the crop and the run directory, then
+        # it's written once and kept there as long as the instance lives.
+        write_control_file(self.RUN_PATH, self._crop_name)
+        # The run directory is kept between runs, and removed when the 
+        # instance is garbage collected.
+        self._rmtree = weakref.finalize(self, shutil.rmtree, self.RUN_PATH, True)
+        self._reset()
 
-            self.RUN_PATH = os.path.join(
-                TMP, "dssatrun"+''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            )
-            if not os.path.exists(self.RUN_PATH):
-                os.mkdir(self.RUN_PATH)      
-        
+    def _reset(self):
+        """
+        Sets the treatments and the files built from them to their initial,
+        empty, state.
+        """
         self.weather = []
         self.soil = []
         self.soil_profile = []
@@ -125,13 +439,25 @@ class GSRun():
         self.nitrogen = []
         self.cultivar = []
         self.treatments = []
-        self.overview = None # This will save the overview file
-        self.summary = None # This will save the summary file
+        # Index of each value in the lists above, to find them without a search
+        self._weather_idx = {}
+        self._soil_idx = {}
+        self._soil_profile_idx = {}
+        self._field_idx = {}
+        self._planting_idx = {}
+        self._nitrogen_idx = {}
+        self._cultivar_idx = {}
+        # Lines of the output files of the last run, read when first accessed.
+        # None if the instance has not run since it was cleared.
+        self._outputs = None
         self.start_date = datetime(9999, 9, 9)
         self.sol_str = ""
         self.gsx_str = ""
         self.batch_str = ""
-        
+        # Files are built as lists of strings, and joined once they are complete
+        self._sol_parts = []
+        self._gsx_parts = []
+        self._batch_parts = []
         
     def add_treatment(self, weather:str, nitrogen:list, planting:datetime,
                       cultivar:str, soil:str=None, **kwargs):
@@ -157,243 +483,240 @@ class GSRun():
         """
 
         assert len(self.treatments) < 99, "99 is the maximum number of treatments"
+        # The planting is checked first, so nothing is added if it's not valid.
+        # Dicts are not hashable, then planting parameters are keyed by their items
+        if isinstance(planting, (datetime, date)):
+            pdate, planting_key = planting, None
+        elif isinstance(planting, dict):
+            assert "PDATE" in planting
+            pdate, planting_key = planting["PDATE"], frozenset(planting.items())
+        else:
+            raise TypeError("Planting must be a datetime or dict with planting parameters")
+        # A date can't be compared with the datetime start_date
+        if not isinstance(pdate, datetime) and isinstance(pdate, date):
+            pdate = datetime(pdate.year, pdate.month, pdate.day)
+        start_date = min(self.start_date, pdate)
 
+        # One can pass either soil_profile string, or soil profile file.
         soil_profile = kwargs.get("soil_profile", False)
-        if weather not in self.weather:
-            self.weather.append(weather)
-        weather_n = self.weather.index(weather) + 1
+        assert soil_profile or soil is not None, "You must pass either soil or soil_profile"
 
-        # One can pass either soil_profile string, or soil profile file.
+        weather_n = self._intern(weather, self._weather_idx, self.weather)
         if soil_profile:
-            if soil_profile not in self.soil_profile:
-                self.soil_profile.append(soil_profile)
-            soil_n = self.soil_profile.index(soil_profile) + 1
+            soil_n = self._intern(soil_profile, self._soil_profile_idx, self.soil_profile)
         else:
-            assert soil is not None, "You must pass either soil or soil_profile"
-            if soil not in self.soil:
-                self.soil.append(soil)
-            soil_n = self.soil.index(soil) + 1
+            soil_n = self._intern(soil, self._soil_idx, self.soil)
 
         field = (weather_n, soil_n)
-        if field not in self.field:
-            self.field.append(field)
-        field_n = self.field.index(field) + 1
-
-        if nitrogen not in self.nitrogen:
-            self.nitrogen.append(nitrogen)
-        nitrogen_n = self.nitrogen.index(nitrogen) + 1
+        field_n = self._intern(field, self._field_idx, self.field)
 
-        if cultivar not in self.cultivar:
-            self.cultivar.append(cultivar)
-        cultivar_n = self.cultivar.index(cultivar) + 1
+        # The order of the applications doesn't change the schedule
+        nitrogen_n = self._intern(
+            nitrogen, self._nitrogen_idx, self.nitrogen, 
+            key=tuple(sorted(map(tuple, nitrogen)))
+        )
+        cultivar_n = self._intern(cultivar, self._cultivar_idx, self.cultivar)
         
-        if planting not in self.planting:
-            self.planting.append(planting)
-        planting_n = self.planting.index(planting) + 1
-        if isinstance(planting, (datetime, date)):
-            self.start_date = min(self.start_date, planting)
-        elif isinstance(planting, dict):
-            assert "PDATE" in planting
-            self.start_date = min(self.start_date, planting["PDATE"])
-        else:
-            raise "Planting must be a datetime or dict with planting parameters"
+        planting_n = self._intern(
+            planting, self._planting_idx, self.planting, key=planting_key
+        )
+        self.start_date = start_date
 
         self.treatments.append((cultivar_n, field_n, planting_n, nitrogen_n))
 
+    @staticmethod
+    def _intern(value, table, storage, key=None):
+        """
+        Returns the 1-based position of value in storage, appending it if it's 
+        not there yet. table maps the key of each stored value to its position, 
+        so the lookup doesn't need to scan storage. The value itself is the key,
+        unless a hashable key is passed.
+        """
+        if key is None:
+            key = value
+        n = table.get(key)
+        if n is None:
+            storage.append(value)
+            n = table[key] = len(storage)
+        return n
+
     def _header_build(self):
-        self.sol_str = "*SOILS: the upper layer of earth in which plants grow\n\n"
-        self.gsx_str = \
-        "*EXP.DETAILS: FLSC8101GS SPATIAL ANALYSES TEST CASE; FLORENCE, SOUTH CAROLINA\n\n" +\
-        "*GENERAL\n" +\
-        "@PEOPLE\n" +\
-        "Diego\n" +\
-        "@ADDRESS\n" +\
-        "Huntsville, Alabama\n" +\
-        "@SITE\n" +\
-        "Site\n" +\
-        "@ PAREA  PRNO  PLEN  PLDR  PLSP  PLAY HAREA  HRNO  HLEN  HARM.........\n" +\
+        self._sol_parts = ["*SOILS: the upper layer of earth in which plants grow\n\n"]
+        self._gsx_parts = [
+        "*EXP.DETAILS: FLSC8101GS SPATIAL ANALYSES TEST CASE; FLORENCE, SOUTH CAROLINA\n\n"
+        "*GENERAL\n"
+        "@PEOPLE\n"
+        "Diego\n"
+        "@ADDRESS\n"
+        "Huntsville, Alabama\n"
+        "@SITE\n"
+        "Site\n"
+        "@ PAREA  PRNO  PLEN  PLDR  PLSP  PLAY HAREA  HRNO  HLEN  HARM.........\n"
         "    -99   -99   -99   -99   -99   -99   -99   -99   -99   -99\n\n"
-        self.batch_str = \
-        "$BATCH(SPATIAL)\n" + \
-        "!\n" + \
-        f"! Directory    : {self.RUN_PATH}\n" + \
-        f'! Command Line : {BIN_NAME} S DSSBatch.v48\n' + \
-        f"! Crop         : Spatial\n" + \
-        f"! Experiment   : EXPEFILE.{CROP_CODES[self._crop_name]}X\n" + \
-        f"! ExpNo        : 1\n" + \
-        f'! Debug        : {BIN_NAME} " S DSSBatch.v48"\n' + \
-        "!\n" + \
+        ]
+        self._batch_parts = [
+        "$BATCH(SPATIAL)\n"
+        "!\n"
+        f"! Directory    : {self.RUN_PATH}\n"
+        f'! Command Line : {BIN_NAME} S DSSBatch.v48\n'
+        f"! Crop         : Spatial\n"
+        f"! Experiment   : EXPEFILE.{self._crop_code}X\n"
+        f"! ExpNo        : 1\n"
+        f'! Debug        : {BIN_NAME} " S DSSBatch.v48"\n'
+        "!\n"
         "@FILEX                                                                                        TRTNO     RP     SQ     OP     CO\n"
+        ]
 
     def _treatment_build(self):
-        self.gsx_str += \
-        "*TREATMENTS                        -------------FACTOR LEVELS------------\n" +\
+        self._gsx_parts.append(
+        "*TREATMENTS                        -------------FACTOR LEVELS------------\n"
         "@N R O C TNAME.................... CU FL SA IC MP MI MF MR MC MT ME MH SM\n" 
-        for n, treat in enumerate(self.treatments, 1):
-            cultivar_n, field_n, planting_n, nitrogen_n = treat
-            self.gsx_str += \
-            "{:-2} 1 0 0 SAMPLE {:<18} {:-2} {:-2}  0 {:-2} {:-2}  0 {:-2}  0  0  0  0  0  1\n".format(
-                n, n, cultivar_n, field_n, 0, planting_n, nitrogen_n
-            ) # IC is 0, then default options are used (Field capacity, zero nitrogen)
-            self.batch_str += \
-            f"{os.path.join(self.RUN_PATH, f'EXPEFILE.{CROP_CODES[self._crop_name]}X'):<96} {n:-2}      1      0      0      0\n"
-        self.gsx_str += "\n" 
+        )
+        # IC is 0, then default options are used (Field capacity, zero nitrogen)
+        self._gsx_parts.append("".join(
+            _TRT_TMPL % (n, n, cultivar_n, field_n, 0, planting_n, nitrogen_n)
+            for n, (cultivar_n, field_n, planting_n, nitrogen_n) in enumerate(self.treatments, 1)
+        ))
+        self._gsx_parts.append("\n")
+
+    def _batch_lines(self, expe_file):
+        """
+        Returns the batch file lines to run all treatments in expe_file.
+        """
+        return "".join(
+            _BATCH_TMPL % (expe_file, n) for n, _ in enumerate(self.treatments, 1)
+        )
 
     def _cultivar_build(self):
-        self.gsx_str += \
-        "*CULTIVARS\n" +\
+        self._gsx_parts.append(
+        "*CULTIVARS\n"
         "@C CR INGENO CNAME\n"
-        for n, cul in enumerate(self.cultivar, 1):
-            self.gsx_str += \
-            "{:-2} {:>2} {:>6} {:<8}\n".format(n, CROP_CODES[self._crop_name], cul, cul)
-        self.gsx_str += "\n" 
-
-    def _field_build(self):
+        )
+        crop_code = self._crop_code
+        self._gsx_parts.append("".join(
+            _CUL_TMPL % (n, crop_code, cul, cul)
+            for n, cul in enumerate(self.cultivar, 1)
+        ))
+        self._gsx_parts.append("\n")
+
+    def _field_build(self, wth_offset=0, soil_offset=0):
         yr = str(self.start_date.year)[2:]
-        self.gsx_str += \
-        "*FIELDS\n" + \
+        self._gsx_parts.append(
+        "*FIELDS\n"
         "@L ID_FIELD WSTA....  FLSA  FLOB  FLDT  FLDD  FLDS  FLST SLTX  SLDP  ID_SOIL    FLNAME\n" 
-        for n, (weather_n, soil_n) in enumerate(self.field, 1):
-            weather_sufix = self.weather[weather_n-1][-8:-4]
-            wth_id = WTH_IDS[weather_n - 1]
-            self.gsx_str += \
-            "{0:-2} SEFL00{0:02} SE{1}{2}   -99     0 DR000     0     0 00000 -99    200  IB000000{3:-02} -99\n".format(n, wth_id, weather_sufix, soil_n)
-        self.gsx_str += "\n" 
+        )
+        self._gsx_parts.append("".join(
+            _FIELD_TMPL % (
+                n, n, WTH_IDS[weather_n - 1 + wth_offset], 
+                self.weather[weather_n-1][-8:-4], soil_n + soil_offset
+            )
+            for n, (weather_n, soil_n) in enumerate(self.field, 1)
+        ))
+        self._gsx_parts.append("\n")
         
-    def _ic_build(self):
-        """
-        Build the initial conditions section. Creates the soil file.
-        """
-        for n, (_, field_n, _, _) in enumerate(self.treatments, 1):
-            soil_n = self.field[field_n-1][1]
-            soil_path = self.soil[soil_n-1]
-            with open(soil_path, "r") as f:
-                soil_lines = f.readlines()
-
-            fieldCap = []
-            for layer_line in soil_lines[6:]:
-                if len(layer_line) > 2:
-                    fieldCap.append((layer_line[:6], layer_line[19:24]))
-            fieldCap = np.array(fieldCap).astype(float)
-            fieldCap = np.hstack([fieldCap, np.ones(fieldCap.shape)*.01]) # Default value for initial NO3 and NH4
-
-    
     def _planting_build(self):
-        self.gsx_str += \
-        "*PLANTING DETAILS\n" + \
+        self._gsx_parts.append(
+        "*PLANTING DETAILS\n"
         "@P PDATE EDATE  PPOP  PPOE  PLME  PLDS  PLRS  PLRD  PLDP  PLWT  PAGE  PENV  PLPH  SPRL                        PLNAME\n"
-        for n, planting in enumerate(self.planting, 1):
-            if isinstance(planting, (datetime, date)):
-                planting = {"PDATE": planting}
-            planting["PDATE"] = planting["PDATE"].strftime("%y%j")
-            if ("EDATE" in planting) and (planting["EDATE"] != -99):
-                assert isinstance(planting["EDATE"], (date, datetime)) 
-                planting["EDATE"] = planting["EDATE"].strftime("%y%j")
-            options = [
-                planting.get(key, DEFAULT_PLANTING_OPTIONS[key]) 
-                for key in DEFAULT_PLANTING_OPTIONS
-            ]
-            options = [n] + options
-            self.gsx_str += \
-            "{:-2} {:>5} {:>5} {:>5.1f} {:>5.1f} {:>5} {:>5} {:>5.0f} {:>5.0f} {:>5.0f} {:>5.0f} {:>5.0f} {:>5.0f} {:>5.0f} {:>5.0f}                        -99\n". format(*options)
-        self.gsx_str += "\n" 
+        )
+        self._gsx_parts.append("".join(
+            self._planting_row(n, planting)
+            for n, planting in enumerate(self.planting, 1)
+        ))
+        self._gsx_parts.append("\n")
+
+    @staticmethod
+    def _planting_row(n, planting):
+        """
+        Returns the line of the n-th planting, with the dates as DSSAT dates. 
+        The planting in self.planting is not modified, then the treatment can 
+        be built again.
+        """
+        if isinstance(planting, (datetime, date)):
+            planting = {"PDATE": planting}
+        p = {**DEFAULT_PLANTING_OPTIONS, **planting}
+        pdate = _yyjjj(p["PDATE"])
+        edate = p["EDATE"]
+        if edate != -99:
+            assert isinstance(edate, (date, datetime)) 
+            edate = _yyjjj(edate)
+        return _PLANT_TMPL % (
+            n, pdate, edate, p["PPOP"], p["PPOE"], p["PLME"], p["PLDS"], 
+            p["PLRS"], p["PLRD"], p["PLDP"], p["PLWT"], p["PAGE"], p["PENV"], 
+            p["PLPH"], p["SPRL"]
+        )
 
     def _fertilizer_build(self):
-        self.gsx_str += \
-        "*FERTILIZERS (INORGANIC)\n" + \
+        self._gsx_parts.append(
+        "*FERTILIZERS (INORGANIC)\n"
         "@F FDATE  FMCD  FACD  FDEP  FAMN  FAMP  FAMK  FAMC  FAMO  FOCD FERNAME\n" 
-        for nitrogen_n, nitrogen in enumerate(self.nitrogen, 1):
-            for dap, rate in nitrogen:
-                self.gsx_str += \
-                "{0:-2} {1:<5} FE005   -99     5 {2:5.1f}   -99   -99   -99   -99   -99 -99\n".format(
-                    nitrogen_n, dap, rate
-                )
-        self.gsx_str += "\n" 
+        )
+        self._gsx_parts.append("".join(
+            _FERT_TMPL % (nitrogen_n, dap, rate)
+            for nitrogen_n, nitrogen in enumerate(self.nitrogen, 1)
+            for dap, rate in nitrogen
+        ))
+        self._gsx_parts.append("\n")
 
     def _options_build(self, sim_controls):
-        options = [
-            sim_controls.get(key, DEFAULT_SIMULATION_OPTIONS[key]) 
-            for key in DEFAULT_SIMULATION_OPTIONS
-        ]
-        self.gsx_str += \
-        "*SIMULATION CONTROLS\n" + \
-        "@N GENERAL     NYERS NREPS START SDATE RSEED SNAME.................... SMODEL\n" + \
-        " 1 GE              1     1     S {0:<5}  2150 N SPATIAL ANALYSES TEST\n".format(
-            self.start_date.strftime("%y%j")
-        ) + \
-        "@N OPTIONS     WATER NITRO SYMBI PHOSP POTAS DISES  CHEM  TILL   CO2\n" + \
-        " 1 OP              {0}     {1}     {2}     {3}     {4}     N     N     N     {5}\n".format(*options) + \
-        "@N METHODS     WTHER INCON LIGHT EVAPO INFIL PHOTO HYDRO MESOM MESEV MESOL\n" + \
-        " 1 ME              M     M     {6}     {7}     {8}     {9}     R     {10}     {11}     {12}\n".format(*options) + \
-        "@N MANAGEMENT  PLANT IRRIG FERTI RESID HARVS\n" + \
-        " 1 MA              {17}     {13}     D     N     M\n".format(*options) + \
-        "@N OUTPUTS     FNAME OVVEW SUMRY FROPT GROUT CAOUT WAOUT NIOUT MIOUT DIOUT VBOSE CHOUT OPOUT FMOPT\n" + \
-        " 1 OU              N     Y     Y     1     Y     N     N     N     N     N     Y     N     N     A\n\n" + \
-        "@  AUTOMATIC MANAGEMENT\n" + \
-        "@N PLANTING    PFRST PLAST PH2OL PH2OU PH2OD PSTMX PSTMN\n" + \
-        " 1 PL          {18} {19} {20:>5d} {21:>5d} {22:>5d} {23:>5d} {24:>5d}\n".format(*options) + \
-        "@N IRRIGATION  IMDEP ITHRL ITHRU IROFF IMETH IRAMT IREFF\n" + \
-        " 1 IR          {14:>5d} {15:>5d} {16:>5d} GS000 IR003    10     1\n".format(*options) + \
-        "@N NITROGEN    NMDEP NMTHR NAMNT NCODE NAOFF\n" + \
-        " 1 NI             30    50    25 FE001 GS000\n" + \
-        "@N RESIDUES    RIPCN RTIME RIDEP\n" + \
-        " 1 RE            100     1    20\n" + \
-        "@N HARVEST     HFRST HLAST HPCNP HPCNR\n" + \
+        o = {**DEFAULT_SIMULATION_OPTIONS, **sim_controls}
+        self._gsx_parts.append(
+        "*SIMULATION CONTROLS\n"
+        "@N GENERAL     NYERS NREPS START SDATE RSEED SNAME.................... SMODEL\n"
+        f" 1 GE              1     1     S {_yyjjj(self.start_date):<5}  2150 N SPATIAL ANALYSES TEST\n"
+        "@N OPTIONS     WATER NITRO SYMBI PHOSP POTAS DISES  CHEM  TILL   CO2\n"
+        f" 1 OP              {o['WATER']}     {o['NITRO']}     {o['SYMBI']}     {o['PHOSP']}     {o['POTAS']}     N     N     N     {o['CO2']}\n"
+        "@N METHODS     WTHER INCON LIGHT EVAPO INFIL PHOTO HYDRO MESOM MESEV MESOL\n"
+        f" 1 ME              M     M     {o['LIGHT']}     {o['EVAPO']}     {o['INFIL']}     {o['PHOTO']}     R     {o['MESOM']}     {o['MESEV']}     {o['MESOL']}\n"
+        "@N MANAGEMENT  PLANT IRRIG FERTI RESID HARVS\n"
+        f" 1 MA              {o['PLANT']}     {o['IRRIG']}     D     N     M\n"
+        "@N OUTPUTS     FNAME OVVEW SUMRY FROPT GROUT CAOUT WAOUT NIOUT MIOUT DIOUT VBOSE CHOUT OPOUT FMOPT\n"
+        " 1 OU              N     Y     Y     1     Y     N     N     N     N     N     Y     N     N     A\n\n"
+        "@  AUTOMATIC MANAGEMENT\n"
+        "@N PLANTING    PFRST PLAST PH2OL PH2OU PH2OD PSTMX PSTMN\n"
+        f" 1 PL          {o['PFRST']} {o['PLAST']} {o['PH2OL']:>5d} {o['PH2OU']:>5d} {o['PH2OD']:>5d} {o['PSTMX']:>5d} {o['PSTMN']:>5d}\n"
+        "@N IRRIGATION  IMDEP ITHRL ITHRU IROFF IMETH IRAMT IREFF\n"
+        f" 1 IR          {o['IMDEP']:>5d} {o['ITHRL']:>5d} {o['ITHRU']:>5d} GS000 IR003    10     1\n"
+        "@N NITROGEN    NMDEP NMTHR NAMNT NCODE NAOFF\n"
+        " 1 NI             30    50    25 FE001 GS000\n"
+        "@N RESIDUES    RIPCN RTIME RIDEP\n"
+        " 1 RE            100     1    20\n"
+        "@N HARVEST     HFRST HLAST HPCNP HPCNR\n"
         " 1 HA              0 81365   100     0\n"
+        )
         # TODO: ADD Irrigation method as an option
-    def run(self, **kwargs) -> pd.DataFrame:
+    def _soil_profiles(self, soil_offset=0):
         """
-        Run DSSAT in spatial mode. It returns a dataframe with the simulation
-        reults. No arguments are required, some are optional tough.
-
-        Arguments
-        ----------
-        start_date: datetime
-            Start date for all treatments. If not provided the earliest planting
-            date is taken.
-        latest_date: datetime
-            Latest date the simulation is expected to end. This parameter is used 
-            to avoid searching weather files that might not be available.
-        sim_controls: dict
-            Simulation control definitions. A dict defining some of the simulation
-            options. An example can be found in spatialDSSAT.run.DEFAULT_SIMULATION_OPTIONS
+        Returns the soil profiles of the current run, renamed to match the
+        ID_SOIL of the fields.
         """
-        assert len(self.treatments) > 0, \
-            "No treatments have been added. Use the add_treatment to add treatments" 
-        self.start_date = kwargs.get("start_date", self.start_date)
-        latest_date = kwargs.get("latest_date", self.start_date + timedelta(days=150))
-        sim_controls = kwargs.get("sim_controls", DEFAULT_SIMULATION_OPTIONS)
-        
-        self._header_build()
-        self._treatment_build()
-        self._cultivar_build()
-        self._field_build()
-        self._planting_build()
-        self._fertilizer_build()
-        self._options_build(sim_controls)
-        
-        write_control_file(self.RUN_PATH, self._crop_name)
+        sol_parts = []
         if len(self.soil_profile) > 0:
-            for n, soil_lines in enumerate(self.soil_profile, 1):
+            for n, soil_lines in enumerate(self.soil_profile, 1 + soil_offset):
                 soil_lines = soil_lines.split("\n")
-                soil_lines[0] = f"*IB000000{n:-02}" + soil_lines[0][11:]
-                self.sol_str += "\n".join(soil_lines)
+                soil_lines[0] = f"*IB{n:08d}" + soil_lines[0][11:]
+                sol_parts.append("\n".join(soil_lines))
         else: 
-            for n, soil_path in enumerate(self.soil, 1):
-                with open(soil_path, "r") as f:
-                    soil_lines = f.readlines()
-                soil_lines[0] = f"*IB000000{n:-02}" + soil_lines[0][11:]
-                self.sol_str += "".join(soil_lines)
-        with open(f"{self.RUN_PATH}/SOIL.SOL", 'w') as f:
-            f.write(self.sol_str)
+            for n, soil_path in enumerate(self.soil, 1 + soil_offset):
+                first_line, body = _soil_profile_parts(
+                    soil_path, os.stat(soil_path).st_mtime_ns
+                )
+                sol_parts.append(f"*IB{n:08d}{first_line}{body}")
+        return "".join(sol_parts)
 
+    def _link_weather(self, run_path, latest_date, wth_offset=0):
+        """
+        Links the weather files of the current run to run_path. It returns the
+        set of links paths.
+        """
         # There two types of Weather files: one .WTH file with data for more than 
         # one year, and one .WTH per year. The .WTH file naming convetion indicates
         # if one .WTH has data for more than one year. For example, the file
         # WSTA2101.WTH contains data for only 2021, while WSTA2102.WTH contains 
         # data for two years starting in 2021.
-        for n, wthpath_from in enumerate(self.weather, 1):
-            wth_id = WTH_IDS[n-1]
+        links = []
+        for wth_id, wthpath_from in zip(WTH_IDS[wth_offset:], self.weather):
+            base = wthpath_from[:-8]
             wth_len = wthpath_from[-6:-4]
             start_year = int(wthpath_from[-8:-6])
             if start_year > 50: # don't think I'll work with data before 1950
@@ -409,59 +732,206 @@ class GSRun():
                 wth_files_range = range(start_year, start_year+1)
             for year in wth_files_range:
                 year = str(year)[2:]
-                wthpath_from = f"{wthpath_from[:-8]}{year}{wth_len}.WTH"
-                wthpath_to = f"{self.RUN_PATH}/SE{wth_id}{year}{wth_len}.WTH"
-                if os.path.exists(wthpath_to):
-                    os.remove(wthpath_to)
-                assert os.path.exists(wthpath_from)
-                os.symlink(wthpath_from, wthpath_to)
-
-        with open(f"{self.RUN_PATH}/EXPEFILE.{CROP_CODES[self._crop_name]}X", 'w') as f:
-            f.write(self.gsx_str)
-
-        with open(f"{self.RUN_PATH}/DSSBatch.v48", 'w') as f:
-            f.write(self.batch_str)
-
-        exc_args = [f"{DSSAT_BIN}", 'S', "DSSBatch.v48"]
-        excinfo = subprocess.run(exc_args, 
-            cwd=self.RUN_PATH, capture_output=True, text=True,
-            env={"DSSAT_HOME": DSSAT_HOME, BIN_NAME: DSSAT_BIN}
-        )
-        out = re.sub(r'(\n{2,})|(\n$)', "", excinfo.stdout)
-        out = re.sub(r'((RUN).+\n.+(t/ha)\n)', "", out)
-        out = re.sub(f'\n.+(Crop).+\n', "\n", out)
-        df = pd.DataFrame(
-            [line.split() for line in out.split("\n")],
-            columns="RUN  CR  TRT FLO MAT TOPWT HARWT  RAIN  TIRR   CET  PESW  TNUP  TNLF   TSON TSOC".split()
-        )
+                links.append((
+                    f"{base}{year}{wth_len}.WTH", 
+                    f"{run_path}/SE{wth_id}{year}{wth_len}.WTH"
+                ))
+        # Each link is a few blocking syscalls, then many of them are made from
+        # a thread pool so their latency overlaps.
+        if len(links) > LINK_WORKERS:
+            with ThreadPoolExecutor(max_workers=LINK_WORKERS) as pool:
+                list(pool.map(_link_weather_file, *zip(*links)))
+        else:
+            for src, dst in links:
+                _link_weather_file(src, dst)
+        return {dst for _, dst in links}
 
-        with open(os.path.join(self.RUN_PATH, "OVERVIEW.OUT")) as f:
-            self.overview = f.readlines()
-        with open(os.path.join(self.RUN_PATH, "Summary.OUT")) as f:
-            self.summary = f.readlines()
-        with open(os.path.join(self.RUN_PATH, "PlantGro.OUT")) as f:
-            self.plantgro = f.readlines()
-        shutil.rmtree(self.RUN_PATH)
-        return df
-    
-    def clear(self):
+    def _build(self, wth_offset=0, soil_offset=0, **kwargs):
         """
-        Clear treatments to define new ones
+        Builds the experiment file for the current run. It returns the latest 
+        date the simulation is expected to end. See the run method for the
+        optional arguments.
         """
-        self.__init__(crop_name=self._crop_name)
+        assert len(self.treatments) > 0, \
+            "No treatments have been added. Use the add_treatment to add treatments" 
+        self.start_date = kwargs.get("start_date", self.start_date)
+        latest_date = kwargs.get("latest_date", self.start_date + timedelta(days=150))
+        sim_controls = kwargs.get("sim_controls", DEFAULT_SIMULATION_OPTIONS)
         
+        self._header_build()
+        self._treatment_build()
+        self._cultivar_build()
+        self._field_build(wth_offset, soil_offset)
+        self._planting_build()
+        self._fertilizer_build()
+        self._options_build(sim_controls)
+        self.gsx_str = "".join(self._gsx_parts)
+        return latest_date
+
+    def run(self, **kwargs) -> pd.DataFrame:
+        """
+        Run DSSAT in spatial mode. It returns a dataframe with the simulation
+        reults. No arguments are required, some are optional tough.
+
+        Arguments
+        ----------
+        start_date: datetime
+            Start date for all treatments. If not provided the earliest planting
+            date is taken.
+        latest_date: datetime
+            Latest date the simulation is expected to end. This parameter is used 
+            to avoid searching weather files that might not be available.
+        sim_controls: dict
+            Simulation control definitions. A dict defining some of the simulation
+            options. An example can be found in spatialDSSAT.run.DEFAULT_SIMULATION_OPTIONS
+        """
+        latest_date = self._build(**kwargs)
+        expe_file = os.path.join(self.RUN_PATH, f"EXPEFILE.{self._crop_code}X")
+        self._sol_parts.append(self._soil_profiles())
+        self._batch_parts.append(self._batch_lines(expe_file))
+        self.sol_str = "".join(self._sol_parts)
+        self.batch_str = "".join(self._batch_parts)
         
-"""
-Lookup table for simulation options
-0   WATER   11  MESEV   22  PH2OD
-1   NITRO   12  MESOL   23  PSTMX
-2   SYMBI   13  IRRIG   24  PSTMN
-3   PHOSP   14  IMDEP   25
-4   POTAS   15  ITHRL   26
-5   CO2     16  ITHRU
-6   LIGHT   17  PLANT
-7   EVAPO   18  PFRST
-8   INFIL   19  PLAST
-9   PHOTO   20  PH2OL
-10  MESOM   21  PH2OU
-"""
\ No newline at end of file
+        links = self._link_weather(self.RUN_PATH, latest_date)
+        # Links left by previous treatments are removed, so DSSAT can't take the
+        # weather file of another location. So are the outputs of the previous run.
+        with os.scandir(self.RUN_PATH) as entries:
+            for entry in entries:
+                if entry.name.endswith(".WTH"):
+                    stale = entry.path not in links
+                else:
+                    stale = entry.name in _OUTPUT_FILES
+                if stale:
+                    os.remove(entry.path)
+        write_files([
+            (f"{self.RUN_PATH}/SOIL.SOL", self.sol_str),
+            (expe_file, self.gsx_str),
+            (f"{self.RUN_PATH}/DSSBatch.v48", self.batch_str),
+        ])
+
+        self._outputs = None
+        df = execute_batch(self.RUN_PATH)
+        self._outputs = {}
+
+        # Weather links and the control file are kept, as they are reused if 
+        # the instance runs again. The output files are kept until they're read.
+        with os.scandir(self.RUN_PATH) as entries:
+            for entry in entries:
+                if not (entry.name.endswith(".WTH") or entry.name in _KEEP_FILES):
+                    os.remove(entry.path)
+        return df
+
+    def _output_lines(self, fname):
+        """
+        Returns the lines of the output file fname of the last run.
+        """
+        if self._outputs is None:
+            return None
+        if fname not in self._outputs:
+            with open(os.path.join(self.RUN_PATH, fname)) as f:
+                self._outputs[fname] = f.readlines()
+        return self._outputs[fname]
+
+    @property
+    def overview(self):
+        """
+        Lines of the OVERVIEW.OUT file of the last run
+        """
+        return self._output_lines("OVERVIEW.OUT")
+
+    @property
+    def summary(self):
+        """
+        Lines of the Summary.OUT file of the last run
+        """
+        return self._output_lines("Summary.OUT")
+
+    @property
+    def plantgro(self):
+        """
+        Lines of the PlantGro.OUT file of the last run
+        """
+        return self._output_lines("PlantGro.OUT")
+
+    @classmethod
+    def run_many(cls, runs:list, concat:bool=False, **kwargs) -> list:
+        """
+        Run several GSRun instances with a single DSSAT call. Each run is written 
+        as an independent experiment file, and all of them are listed in the
+        same batch file. This avoids starting DSSAT once per run when many runs
+        are simulated. It returns a list with one dataframe per run, in the same
+        order as runs. The optional arguments are the same of the run method, 
+        and they apply to all runs.
+
+        Arguments
+        ----------
+        runs: list of GSRun
+            The runs to simulate. All of them must be for the same crop.
+        concat: bool
+            If True, the results of all runs are returned as a single dataframe,
+            as DSSAT printed them, instead of splitting them by run. The RUN 
+            column tells the runs apart, as it continues from one run to the 
+            next one.
+        """
+        assert len(runs) > 0, "No runs have been passed"
+        crop_name = runs[0]._crop_name
+        assert all(gs._crop_name == crop_name for gs in runs), \
+            "All runs must be for the same crop"
+        assert sum(len(gs.weather) for gs in runs) <= MAX_WTH_IDS, \
+            f"{MAX_WTH_IDS} is the maximum number of weather files per batch"
+        crop_code = runs[0]._crop_code
+
+        batch = cls(crop_name=crop_name)
+        batch._header_build()
+        wth_offset, soil_offset = 0, 0
+        for k, gs in enumerate(runs, 1):
+            latest_date = gs._build(wth_offset, soil_offset, **kwargs)
+            expe_file = os.path.join(batch.RUN_PATH, f"EXPE{k:04d}.{crop_code}X")
+            write_file(expe_file, gs.gsx_str)
+            gs._link_weather(batch.RUN_PATH, latest_date, wth_offset)
+            batch._sol_parts.append(gs._soil_profiles(soil_offset))
+            batch._batch_parts.append(gs._batch_lines(expe_file))
+            wth_offset += len(gs.weather)
+            soil_offset += max(len(gs.soil), len(gs.soil_profile))
+
+        batch.sol_str = "".join(batch._sol_parts)
+        batch.batch_str = "".join(batch._batch_parts)
+        write_files([
+            (f"{batch.RUN_PATH}/SOIL.SOL", batch.sol_str),
+            (f"{batch.RUN_PATH}/DSSBatch.v48", batch.batch_str),
+        ])
+
+        try:
+            df = execute_batch(batch.RUN_PATH)
+        except RuntimeError:
+            # The batch directory is kept, so the DSSAT errors can be checked
+            batch._rmtree.detach()
+            raise
+        shutil.rmtree(batch.RUN_PATH)
+        if concat:
+            return df
+
+        # Runs are executed in the same order they are listed in the batch file,
+        # then the RUN number tells which GSRun each row belongs to.
+        run_bounds = np.cumsum([len(gs.treatments) for gs in runs])
+        run_idx = np.searchsorted(run_bounds, df.RUN, side="left")
+        return [
+            df[run_idx == k].reset_index(drop=True) for k in range(len(runs))
+        ]
+    
+    def clear(self, purge=False):
+        """
+        Clear treatments to define new ones. The run directory and the crop are
+        kept, so weather files already linked there are not linked again.
+
+        Arguments
+        ----------
+        purge: bool
+            If True, the content of the run directory is removed as well.
+        """
+        if purge:
+            with os.scandir(self.RUN_PATH) as entries:
+                for entry in entries:
+                    os.remove(entry.path)
+            write_control_file(self.RUN_PATH, self._crop_name)
+        self._reset()
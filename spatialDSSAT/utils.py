@@ -2,8 +2,8 @@
 This contains a set of handful funcitons to run the simulations.
 """
 
-from shapely.geometry import Polygon, Point
-from shapely.prepared import prep
+import shapely
+from shapely.geometry import Polygon
 from math import ceil, floor
 import numpy as np
 from datetime import timedelta, datetime
@@ -12,18 +12,16 @@ import pandas as pd
 import rasterio as rio
 from netCDF4 import Dataset
 
-from itertools import product
 from tqdm import tqdm
 import shutil
-
-from DSSATTools import Weather
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 # Functions to get the pixels for the polygon
-def grid_bounds(geom, geotransform):
+def _grid_cells(geom, geotransform):
     """
-    Given a defined geometry and a delta x, it returns a grid (series of polygons)
-    that includes all the geometry. Grid is defined according to the geotransform.
-    geotransform is defined as it's shown in https://gdal.org/tutorials/geotransforms_tut.html
+    Same as grid_bounds, but the grid is returned as a numpy array of polygons.
+    All the polygons are created at once from the array of their corners.
     """
     delta = geotransform[1]
     minx, miny, maxx, maxy = geom.bounds
@@ -32,20 +30,31 @@ def grid_bounds(geom, geotransform):
     nx = round((maxx - minx)/delta) 
     ny = round((maxy - miny)/delta)
     gx, gy = np.linspace(minx,maxx,nx+1), np.linspace(miny,maxy,ny+1)
-    grid = []
-    for i in range(len(gx)-1):
-        for j in range(len(gy)-1):
-            poly_ij = Polygon([[gx[i],gy[j]],[gx[i],gy[j+1]],[gx[i+1],gy[j+1]],[gx[i+1],gy[j]]])
-            grid.append( poly_ij )
-    return grid
+    # Cells are ordered by column (x) and then by row (y)
+    x0, y0 = np.meshgrid(gx[:-1], gy[:-1], indexing="ij")
+    x1, y1 = np.meshgrid(gx[1:], gy[1:], indexing="ij")
+    corners = np.stack([
+        np.stack([x0, y0], -1), np.stack([x0, y1], -1), np.stack([x1, y1], -1),
+        np.stack([x1, y0], -1), np.stack([x0, y0], -1)
+    ], axis=-2).reshape(-1, 5, 2)
+    return shapely.polygons(corners)
+
+def grid_bounds(geom, geotransform):
+    """
+    Given a defined geometry and a delta x, it returns a grid (series of polygons)
+    that includes all the geometry. Grid is defined according to the geotransform.
+    geotransform is defined as it's shown in https://gdal.org/tutorials/geotransforms_tut.html
+    """
+    return list(_grid_cells(geom, geotransform))
 
 def partition(geom, geotransform):
     """"
     It returns a the cells of a grid of delta size that touches that geometry.
     """
-    prepared_geom = prep(geom)
-    grid = list(filter(prepared_geom.intersects, grid_bounds(geom, geotransform)))
-    return grid
+    cells = _grid_cells(geom, geotransform)
+    # All cells are tested in a single call, against the prepared geometry
+    shapely.prepare(geom)
+    return list(cells[shapely.intersects(geom, cells)])
 
 def cust_round(val):
     val = round(val, 2)
@@ -58,9 +67,9 @@ def pixel_coords(geom, geotransform):
     """
     Given a geom it retuns the centroid of the 
     """
-    grid = partition(geom, geotransform)
-    centroids = map(lambda p: p.centroid, grid)
-    return list(map(lambda p: (cust_round(p.x), cust_round(p.y)), centroids))
+    centroids = shapely.centroid(partition(geom, geotransform))
+    xs, ys = shapely.get_x(centroids).tolist(), shapely.get_y(centroids).tolist()
+    return [(cust_round(x), cust_round(y)) for x, y in zip(xs, ys)]
 
 VARIABLE_MAP_AGERA5 = {
     'Wind_Speed_10m_Mean': "WIND", 'Dew_Point_Temperature_2m_Mean': "DEWP", 
@@ -76,9 +85,30 @@ VARIABLE_TRANS_AGERA5 = {
 MINIMUM_VARIABLE_SET = ["TMAX", "TMIN", "SRAD", "RAIN"]
 TEMP_VARS = ["TMAX", "TMIN", "TDEW"]
 
+def _write_wth(pixel):
+    """
+    Writes the .WTH file of one pixel. pixel is a tuple with the pixel data as
+    a (time, variable) array, the variable names, the dates, lat, lon, 
+    elevation and the folder to save the file to.
+    """
+    # DSSATTools is only needed to write the files, so it's not imported 
+    # until then
+    from DSSATTools import Weather
+    values, columns, time, lat, lon, elev, save_to = pixel
+    df = pd.DataFrame(values, columns=columns, index=time)
+    wth = Weather(
+        df=df, pars=dict(zip(df.columns, df.columns)), 
+        lat=lat, lon=lon, elev=elev
+    )
+    wth.REFHT = 2
+    wth.WNDHT = 10
+    wth._name = f"{lon:07.2f}_{lat:07.2f}_{wth._name[4:]}".replace(".", "p")
+    wth.write(save_to)
+
 def weather_from_netcdf(
         nc_file:str,  elev:str|float ,geom:Polygon, save_to:str, 
-        pars:dict=VARIABLE_MAP_AGERA5, trans:dict=VARIABLE_TRANS_AGERA5):
+        pars:dict=VARIABLE_MAP_AGERA5, trans:dict=VARIABLE_TRANS_AGERA5,
+        n_workers:int=1):
     """
     Creates .WTH files for the pixels within a polygon from a AgERA5 netCDF file.
 
@@ -101,7 +131,15 @@ def weather_from_netcdf(
         the units of netcdf variable to the units required by DSSAT. For example, 
         if temperature is in Kelvin in the netcdf, then a function that transform 
         from Kelvin to Celsius would be needed. If not provided then AgERA5 is assumed 
-        and default transformations are used.
+        and default transformations are used. Functions are applied to numpy
+        arrays with the data of all the pixels, so they must be vectorized 
+        (e.g. lambda x: x - 273.15).
+    n_workers: int
+        Number of processes writing the .WTH files. By default (1) the files 
+        are written by this process. With None half of the available CPUs are
+        used. When more than one process is used, the calling script must be
+        guarded with if __name__ == "__main__" on platforms that spawn the
+        processes (macOS and Windows).
     """
     assert all(map(lambda x: x in pars.values(), MINIMUM_VARIABLE_SET)), \
         f"netCDF file must contain at least {', '.join(MINIMUM_VARIABLE_SET)}"
@@ -119,12 +157,51 @@ def weather_from_netcdf(
     # Buffer ensures that at least one pixel will be selected
     geom = geom.buffer(np.float32(x[1] - x[0])*.5)
 
+    # Only the lat/lon window within the bounds of geom is read from the file
+    minx, miny, maxx, maxy = geom.bounds
+    lons, lats = np.asarray(x), np.asarray(y)
+    rows = np.nonzero((lats >= miny) & (lats <= maxy))[0]
+    cols = np.nonzero((lons >= minx) & (lons <= maxx))[0]
+    rows = slice(rows.min(), rows.max() + 1) if len(rows) else slice(0, 0)
+    cols = slice(cols.min(), cols.max() + 1) if len(cols) else slice(0, 0)
+    x, y = x[cols], y[rows]
+    lons, lats = lons[cols], lats[rows]
     all_data = np.array([
-        ds.variables[var][:] for var in pars.keys()
+        ds.variables[var][:, rows, cols] for var in pars.keys()
     ]) # dimensions: variable, time, lat, lon
-
-    generator_list = zip(product(range(len(y)), range(len(x))), product(y, x))
-    generator_list = list(filter(lambda x: geom.contains(Point(x[1][::-1])), generator_list))
+    # Everything is in memory now. The file is closed before the workers start.
+    ds.close()
+
+    # All the pixels in the window are tested at once
+    jj, ii = np.nonzero(
+        (lats[:, None] >= miny) & (lats[:, None] <= maxy) & 
+        (lons[None, :] >= minx) & (lons[None, :] <= maxx)
+    )
+    shapely.prepare(geom)
+    inside = shapely.contains_xy(geom, lons[ii], lats[jj])
+    jj, ii = jj[inside], ii[inside]
+
+    # Data of the selected pixels. dimensions: variable, time, pixel
+    columns = list(pars.values())
+    var_n = {var: n for n, var in enumerate(columns)}
+    data = all_data[:, :, jj, ii]
+    # Maybe no records in the sea
+    land = ~(data[var_n["RAIN"]].mean(axis=0) < 0)
+    data, jj, ii = data[:, :, land], jj[land], ii[land]
+    if len(jj) == 0:
+        # No pixel to write (e.g. all of them are in the sea)
+        return
+    # Some have TMIN slightly higher than TMAX
+    tmax, tmin = data[var_n["TMAX"]], data[var_n["TMIN"]]
+    data[var_n["TMAX"]] = np.where(tmax > tmin, tmax, tmin + .1)
+    # Apply transformations, to all pixels at once
+    data = data.astype(float)
+    for var, n in var_n.items():
+        data[n] = trans[var](data[n])
+    assert data[var_n["SRAD"]].min() > 0
+    data[var_n["RAIN"]] = np.abs(data[var_n["RAIN"]])
+
+    generator_list = list(zip(zip(jj, ii), zip(y[jj], x[ii])))
     
     if isinstance(elev, str):
         elev = rio.open(elev)
@@ -132,31 +209,19 @@ def weather_from_netcdf(
         elev_list = list(map(int, elev_list))
     else:
         elev_list = [elev]*len(generator_list)
-    n = 0
-    for (j, i), (lat, lon) in tqdm(generator_list):
-        lat = cust_round(lat)
-        lon = cust_round(lon)
-
-        df = pd.DataFrame(
-            all_data[:, :, j, i].T, columns=pars.keys(),
-            index=time
-        )
-        df = df.rename(columns=pars)
-        if df.RAIN.mean() < 0: # Maybe no records in the sea
-            continue
-        # Some have TMIN slightly higher than TMAX
-        df["TMAX"] = np.where(df["TMAX"] > df["TMIN"], df["TMAX"], df["TMIN"] +.1)
-        # Apply transformations
-        for var in df.columns:
-            df[var] = df[var].map(trans[var])
-        assert df.SRAD.min() > 0
-        df["RAIN"] = df["RAIN"].abs()
-        wth = Weather(
-            df=df, pars=dict(zip(df.columns, df.columns)), 
-            lat=lat, lon=lon, elev=elev_list[n]
-        )
-        wth.REFHT = 2
-        wth.WNDHT = 10
-        wth._name = f"{lon:07.2f}_{lat:07.2f}_{wth._name[4:]}".replace(".", "p")
-        wth.write(save_to)
-        n+=1
+    pixels = [
+        (data[:, :, n].T, columns, time, cust_round(lat), cust_round(lon), 
+         elev_list[n], save_to)
+        for n, (_, (lat, lon)) in enumerate(generator_list)
+    ]
+    # Each pixel is written independently, then the files are written in parallel
+    if n_workers is None:
+        n_workers = max(1, os.cpu_count()//2)
+    if n_workers == 1:
+        for pixel in tqdm(pixels):
+            _write_wth(pixel)
+    else:
+        chunksize = max(1, len(pixels)//(4*n_workers))
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for _ in tqdm(executor.map(_write_wth, pixels, chunksize=chunksize), total=len(pixels)):
+                pass